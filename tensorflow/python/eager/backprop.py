@@ -612,14 +612,15 @@ def _zeros(shape, dtype):
 
   device = ctx.device_name
   cache_key = shape, dtype, device
-  cached = ctx.zeros_cache().get(cache_key)
+  zeros_cache = ctx.zeros_cache()
+  cached = zeros_cache.get(cache_key)
   if cached is None:
     if dtypes.as_dtype(dtype).is_bool:
       value = False
     else:
       value = 0
     cached = _fast_fill(value, shape, dtype)
-    ctx.zeros_cache().put(cache_key, cached)
+    zeros_cache.put(cache_key, cached)
   return cached
 
 
@@ -18,21 +18,18 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-import collections
-import contextlib
-import copy
 import random
 import threading
 
+import six
+
 from tensorflow.core.protobuf import config_pb2
 from tensorflow.core.protobuf import rewriter_config_pb2
 from tensorflow.python import pywrap_tensorflow
 from tensorflow.python import tf2
 from tensorflow.python.framework import c_api_util
 from tensorflow.python.framework import device as pydev
-from tensorflow.python.util import compat
 from tensorflow.python.util import is_in_graph_mode
-from tensorflow.python.util import tf_contextlib
 from tensorflow.python.util.tf_export import tf_export
 
 GRAPH_MODE = 0
@@ -41,14 +38,59 @@ EAGER_MODE = 1
 default_execution_mode = EAGER_MODE if tf2.enabled() else GRAPH_MODE
 
 # Cache from (old_device_name, partial_new_device_name) -> (new_device_name,
-# new_device_spec).
+# new_device_spec), split into shards selected by the hash of the partial
+# device name so that concurrent threads rarely contend on the same dict.
 # Note that we do not protect this with a lock and instead rely on python's GIL
 # and the idempotent nature of writes to provide thread safety.
-_device_parsing_cache = {}
+_DEVICE_PARSING_CACHE_SHARDS = 16
+_device_parsing_cache = [{} for _ in range(_DEVICE_PARSING_CACHE_SHARDS)]
 _starting_device_spec = pydev.DeviceSpec.from_string("")
 
+# Cache from device names reported by the runtime to their canonical form.
+_canonical_device_names = {}
+
 _MAXINT32 = 2**31 - 1
 
+# RewriterConfig fields settable through the optimizer experimental options,
+# either as ON/OFF toggles or as plain booleans.
+_REWRITER_TOGGLES = (
+    "layout_optimizer",
+    "constant_folding",
+    "shape_optimization",
+    "remapping",
+    "arithmetic_optimization",
+    "dependency_optimization",
+    "loop_optimization",
+    "function_optimization",
+    "debug_stripper",
+    "scoped_allocator_optimization",
+    "pin_to_host_optimization",
+    "implementation_selector",
+)
+_REWRITER_BOOLS = (
+    "disable_model_pruning",
+    "disable_meta_optimizer",
+)
+_REWRITER_ON = rewriter_config_pb2.RewriterConfig.ON
+_REWRITER_OFF = rewriter_config_pb2.RewriterConfig.OFF
+
+# All optimizer experimental options, in the order in which `Context` stores
+# their values, and the index of each option in that list. Unknown options are
+# ignored, as the config never picked them up.
+_OPTIMIZER_OPTIONS = _REWRITER_TOGGLES + _REWRITER_BOOLS + ("min_graph_nodes",)
+_OPTIMIZER_OPTION_INDEX = dict(
+    (option, i) for i, option in enumerate(_OPTIMIZER_OPTIONS))
+_REWRITER_BOOLS_START = len(_REWRITER_TOGGLES)
+_MIN_GRAPH_NODES_INDEX = len(_OPTIMIZER_OPTIONS) - 1
+
+# Global JIT levels for which `Context.optimizer_jit` reports True.
+_JIT_ON_LEVELS = frozenset((config_pb2.OptimizerOptions.ON_1,
+                            config_pb2.OptimizerOptions.ON_2))
+
+# Serialization of an empty ConfigProto, used by `FunctionCallOptions` when no
+# config is given.
+_EMPTY_SERIALIZED_CONFIG = config_pb2.ConfigProto().SerializeToString()
+
 DEVICE_PLACEMENT_EXPLICIT = pywrap_tensorflow.TFE_DEVICE_PLACEMENT_EXPLICIT
 DEVICE_PLACEMENT_WARN = pywrap_tensorflow.TFE_DEVICE_PLACEMENT_WARN
 DEVICE_PLACEMENT_SILENT = pywrap_tensorflow.TFE_DEVICE_PLACEMENT_SILENT
@@ -57,29 +99,96 @@ DEVICE_PLACEMENT_SILENT_FOR_INT32 = (
 SYNC = 0
 ASYNC = 1
 
+# Reserved shared name for which the runtime generates a unique name.
+_EAGER_SHARED_NAME = "cd2c89b7-88b7-44c8-ad83-06c2a9158347"
+
+# Module-level aliases of pywrap_tensorflow functions called per function
+# call or per device list refresh, to avoid the module attribute lookup.
+_TFE_ContextAsyncWait = pywrap_tensorflow.TFE_ContextAsyncWait
+_TFE_ContextAsyncClearError = pywrap_tensorflow.TFE_ContextAsyncClearError
+_TFE_ContextAddFunction = pywrap_tensorflow.TFE_ContextAddFunction
+_TFE_ContextAddFunctionDef = pywrap_tensorflow.TFE_ContextAddFunctionDef
+_TFE_ContextHasFunction = pywrap_tensorflow.TFE_ContextHasFunction
+_TFE_ContextListDevices = pywrap_tensorflow.TFE_ContextListDevices
+_TF_DeviceListCount = pywrap_tensorflow.TF_DeviceListCount
+_TF_DeviceListName = pywrap_tensorflow.TF_DeviceListName
+_TF_DeviceListType = pywrap_tensorflow.TF_DeviceListType
+_TF_DeleteDeviceList = pywrap_tensorflow.TF_DeleteDeviceList
+
 
 class _EagerTensorCache(object):
-  """Simple cache which evicts items based on length in a FIFO manner."""
+  """Fixed-capacity cache which evicts items in an approximate LRU manner.
+
+  Entries live in a preallocated ring of slots indexed by a dict from key to
+  slot, and are evicted with the CLOCK (second-chance) policy: each slot
+  carries a reference bit which is set by `get`; when a slot is needed, the
+  eviction cursor skips (and clears) referenced slots, so recently used tensors
+  survive at least one more pass over the ring.
+
+  Keys may be any hashable value; the ones-rank cache keys on the rank and the
+  zeros cache on a `(shape, dtype, device)` tuple.
+  """
 
   def __init__(self, max_items=256, max_tensor_size=10000):
-    self._data = collections.OrderedDict()
-    self._max_items = max_items
+    # Round the capacity up to a power of two so that the cursor can wrap with
+    # a mask instead of a modulo.
+    capacity = 1
+    while capacity < max_items:
+      capacity <<= 1
+    self._max_items = capacity
+    self._mask = capacity - 1
     self._max_tensor_size = max_tensor_size
+    self.flush()
 
   def put(self, key, value):
     if value._num_elements() > self._max_tensor_size:  # pylint: disable=protected-access
       return
 
-    self._data[key] = value
+    index = self._index
+    slot = index.get(key)
+    if slot is not None:
+      self._slots[slot] = value
+      return
 
-    if len(self._data) > self._max_items:
-      self._data.popitem(last=False)
+    keys = self._keys
+    refs = self._refs
+    mask = self._mask
+    slot = self._next & mask
+    # Each visited referenced slot loses its reference bit, so this loop runs
+    # at most one full pass over the ring.
+    while refs[slot]:
+      refs[slot] = 0
+      slot = (slot + 1) & mask
+    self._next = slot + 1
+
+    if self._slots[slot] is not None:
+      del index[keys[slot]]
+    keys[slot] = key
+    self._slots[slot] = value
+    index[key] = slot
 
   def get(self, key):
-    return self._data.get(key, None)
+    slot = self._index.get(key)
+    if slot is None:
+      return None
+    self._refs[slot] = 1
+    return self._slots[slot]
 
   def flush(self):
-    self._data = {}
+    self._slots = [None] * self._max_items
+    self._keys = [None] * self._max_items
+    self._refs = [0] * self._max_items
+    self._index = {}
+    self._next = 0
+
+
+def _canonical_name(device_name):
+  """Memoized version of `pydev.canonical_name` for device name strings."""
+  name = _canonical_device_names.get(device_name)
+  if name is None:
+    name = pydev.canonical_name(device_name)
+    _canonical_device_names[device_name] = name
+  return name
 
 
 class FunctionCallOptions(object):
@@ -88,6 +197,8 @@ class FunctionCallOptions(object):
   Eager functions are functions decorated with tf.contrib.eager.defun.
   """
 
+  __slots__ = ["_config_proto_serialized", "_executor_type"]
+
   def __init__(self, executor_type=None, config_proto=None):
     """Constructor.
 
@@ -119,38 +230,68 @@ class FunctionCallOptions(object):
 
   @config_proto_serialized.setter
   def config_proto_serialized(self, config):
-    if isinstance(config, config_pb2.ConfigProto):
-      self._config_proto_serialized = config.SerializeToString()
-    elif isinstance(config, str):
+    if isinstance(config, (bytes, str)):
       self._config_proto_serialized = config
     elif config is None:
-      self._config_proto_serialized = (
-          config_pb2.ConfigProto().SerializeToString())
+      self._config_proto_serialized = _EMPTY_SERIALIZED_CONFIG
+    elif isinstance(config, config_pb2.ConfigProto):
+      self._config_proto_serialized = config.SerializeToString()
     else:
       raise ValueError("the rewriter config must be either a "
                        "config_pb2.ConfigProto, or a serialized string of that "
                        "proto or None. got: {}".format(type(config)))
 
 
+# Defaults for the `_ThreadLocalData` fields which are only materialized the
+# first time they are read on a given thread. Callable defaults are factories
+# producing a fresh value for each thread.
+_THREAD_LOCAL_DEFAULTS = {
+    "scope_name": "",
+    "summary_writer": None,
+    "summary_recording": None,
+    "summary_recording_distribution_strategy": True,
+    "summary_step": None,
+    "scalar_cache": dict,
+    "_ones_rank_cache": None,
+    "_zeros_cache": None,
+    "execution_mode": SYNC,
+    "function_call_options": None,
+    "function_call_options_version": 0,
+    # Cache from partial_new_device_name -> (new_device_name, new_device_spec)
+    # for device scopes entered while no other device scope is active.
+    "device_parsing_cache": dict,
+    # Execution modes to restore when leaving the active `_ModeScope`s.
+    "saved_is_eager": list,
+}
+
+
 class _ThreadLocalData(threading.local):
   """Thread local storage for the eager context."""
 
   def __init__(self):
     super(_ThreadLocalData, self).__init__()
+    # `__init__` runs on every thread which touches this object, so only the
+    # fields read on each op are set here; see `__getattr__` for the rest.
     self.device_spec = _starting_device_spec
     self.device_name = ""
-    self.mode = default_execution_mode
     self.is_eager = default_execution_mode == EAGER_MODE
-    self.scope_name = ""
-    self.summary_writer = None
-    self.summary_recording = None
-    self.summary_recording_distribution_strategy = True
-    self.summary_step = None
-    self.scalar_cache = {}
-    self._ones_rank_cache = None
-    self._zeros_cache = None
-    self.execution_mode = SYNC
-    self.function_call_options = None
+
+  @property
+  def mode(self):
+    # Derived from `is_eager` so that mode switches only update one field.
+    return EAGER_MODE if self.is_eager else GRAPH_MODE
+
+  def __getattr__(self, name):
+    # Only called for attributes not yet set on the current thread.
+    try:
+      value = _THREAD_LOCAL_DEFAULTS[name]
+    except KeyError:
+      raise AttributeError("'%s' object has no attribute '%s'" %
+                           (type(self).__name__, name))
+    if callable(value):
+      value = value()
+    setattr(self, name, value)
+    return value
 
   @property
   def ones_rank_cache(self):
@@ -165,19 +306,40 @@ class _ThreadLocalData(threading.local):
     return self._zeros_cache
 
 
-ContextSwitch = collections.namedtuple(
-    "ContextSwitch", ["is_building_function", "enter_context_fn",
-                      "device_stack"])
+class ContextSwitch(object):
+  """Metadata about a context switch; see `_ContextSwitchStack.push`."""
+
+  __slots__ = ["is_building_function", "enter_context_fn", "device_stack"]
+
+  def __init__(self, is_building_function, enter_context_fn, device_stack):
+    self.is_building_function = is_building_function
+    self.enter_context_fn = enter_context_fn
+    self.device_stack = device_stack
+
+  def __iter__(self):
+    # Supports tuple unpacking, as ContextSwitch used to be a namedtuple.
+    yield self.is_building_function
+    yield self.enter_context_fn
+    yield self.device_stack
+
+  def __repr__(self):
+    return ("ContextSwitch(is_building_function=%r, enter_context_fn=%r, "
+            "device_stack=%r)" % tuple(self))
 
 
 # `_ContextSwitchStack` is a `threading.local` to match the semantics of
 # ``DefaultGraphStack`, which is also a `threading.local`.
 class _ContextSwitchStack(threading.local):
-  """A thread-local stack of context switches."""
+  """A thread-local stack of context switches.
+
+  `ContextSwitch` entries are allocated the first time the stack reaches a
+  given depth and are reused by later pushes to that depth.
+  """
 
   def __init__(self, eager):
     super(_ContextSwitchStack, self).__init__()
-    self.stack = []
+    self._switches = []
+    self._size = 0
     if eager:
       # Initialize the stack with a pointer to enter the eager context; this
       # ensures that the fact that eager execution was enabled is propagated
@@ -187,6 +349,14 @@ class _ContextSwitchStack(threading.local):
       self.push(is_building_function=False, enter_context_fn=eager_mode,
                 device_stack=None)
 
+  @property
+  def stack(self):
+    """A list of the active `ContextSwitch`es, innermost last.
+
+    The entries are reused once popped, so they should not be held on to.
+    """
+    return self._switches[:self._size]
+
   def push(self, is_building_function, enter_context_fn, device_stack):
     """Push metadata about a context switch onto the stack.
 
@@ -203,14 +373,102 @@ class _ContextSwitchStack(threading.local):
         device stack is used. Eager contexts put `None` here and the value is
         never used.
     """
-
-    self.stack.append(
-        ContextSwitch(is_building_function, enter_context_fn, device_stack))
+    size = self._size
+    if size == len(self._switches):
+      self._switches.append(
+          ContextSwitch(is_building_function, enter_context_fn, device_stack))
+    else:
+      switch = self._switches[size]
+      switch.is_building_function = is_building_function
+      switch.enter_context_fn = enter_context_fn
+      switch.device_stack = device_stack
+    self._size = size + 1
 
   def pop(self):
     """Pop the stack."""
+    if not self._size:
+      raise IndexError("pop from empty context switch stack")
+    self._size -= 1
+    # Drop references to the graph and its device stack held by the entry.
+    switch = self._switches[self._size]
+    switch.enter_context_fn = None
+    switch.device_stack = None
+
+
+# pylint: disable=protected-access
+class _ModeScope(object):
+  """Context manager which sets the execution mode of the current thread.
+
+  One instance per mode is shared by all users of a `Context`, so the state to
+  restore is kept on a stack in the thread-local data rather than on `self`.
+  The scope only holds the context's thread-local data and context switch
+  stack, not the `Context` itself, so that it does not form a reference cycle
+  with the `Context` which owns it.
+  """
+
+  __slots__ = ["_thread_local_data", "_context_switches", "_mode"]
 
-    self.stack.pop()
+  def __init__(self, ctx, mode):
+    self._thread_local_data = ctx._thread_local_data
+    self._context_switches = ctx._context_switches
+    self._mode = mode
+
+  def __enter__(self):
+    mode = self._mode
+    eager_context = self._thread_local_data
+    eager_context.saved_is_eager.append(eager_context.is_eager)
+    eager_context.is_eager = mode == EAGER_MODE
+    if mode == EAGER_MODE:
+      # Entering graph mode does not provide us with sufficient information to
+      # record a context switch; graph-based context switches are only logged
+      # when a graph is registered as the default graph.
+      self._context_switches.push(False, eager_mode, None)
+
+  def __exit__(self, *exc_info):
+    eager_context = self._thread_local_data
+    eager_context.is_eager = eager_context.saved_is_eager.pop()
+    if self._mode == EAGER_MODE:
+      self._context_switches.pop()
+
+
+class _DeviceScope(object):
+  """Context manager which sets the device of the current thread."""
+
+  __slots__ = ["_ctx", "_name", "_old_device_name", "_old_device_spec",
+               "_new_device_spec"]
+
+  def __init__(self, ctx, name):
+    self._ctx = ctx
+    self._name = name
+
+  def __enter__(self):
+    name = self._name
+    eager_context = self._ctx._thread_local_data
+    old_device_name = eager_context.device_name
+    old_device_spec = eager_context.device_spec
+    if name is None:
+      new_device_name = ""
+      new_device_spec = _starting_device_spec
+    elif name and isinstance(name, str) and name == old_device_name:
+      # Re-entering the current (fully specified) device changes nothing.
+      new_device_name = old_device_name
+      new_device_spec = old_device_spec
+    else:
+      new_device_name, new_device_spec = self._ctx._resolve_device(
+          eager_context, name)
+    self._old_device_name = old_device_name
+    self._old_device_spec = old_device_spec
+    self._new_device_spec = new_device_spec
+    eager_context.device_name = new_device_name
+    eager_context.device_spec = new_device_spec
+
+  def __exit__(self, *exc_info):
+    eager_context = self._ctx._thread_local_data
+    if eager_context.device_spec is not self._new_device_spec:
+      raise RuntimeError("Exiting device scope without proper scope nesting")
+    eager_context.device_name = self._old_device_name
+    eager_context.device_spec = self._old_device_spec
+# pylint: enable=protected-access
 
 
 # TODO(agarwal): rename to EagerContext / EagerRuntime ?
@@ -231,6 +489,10 @@ class Context(object):
       config: (Optional.) A `ConfigProto` protocol buffer with configuration
         options for the Context. Note that a lot of these options may be
         currently unimplemented or irrelevant when eager execution is enabled.
+        The Context keeps a reference to this proto but caches the config
+        built from it, so modifications made after it has first been used
+        are not reliably picked up; use the Context's setters to change
+        options instead.
       device_policy: (Optional.) What policy to use when trying to run an
         operation on a device with inputs which are not on that device.
         When set to None, an appropriate value will be picked automatically.
@@ -266,10 +528,13 @@ class Context(object):
     self._config = config
     self._thread_local_data = _ThreadLocalData()
     self._context_switches = _ContextSwitchStack(self.executing_eagerly())
+    self._graph_mode_scope = _ModeScope(self, GRAPH_MODE)
+    self._eager_mode_scope = _ModeScope(self, EAGER_MODE)
     self._context_handle = None
     self._context_devices = None
     self._post_execution_callbacks = []
     self._seed = None
+    self._rng = None
     self._initialize_lock = threading.Lock()
     if device_policy is None:
       device_policy = DEVICE_PLACEMENT_SILENT
@@ -291,14 +556,24 @@ class Context(object):
     self._inter_op_parallelism_threads = None
     self._soft_device_placement = None
     self._log_device_placement = None
-    self._optimizer_experimental_options = {}
+    # Values of the options in `_OPTIMIZER_OPTIONS`, None where unset.
+    self._optimizer_experimental_options = [None] * len(_OPTIMIZER_OPTIONS)
+
+    # Cache from the runtime deltas above to the (config, serialized function
+    # call config) pair built from them. See `_cached_config`.
+    self._config_cache = {}
+    # Bumped by every setter which changes the function call config, so that
+    # each thread rebuilds its `FunctionCallOptions` on next use.
+    self._config_version = 0
 
   # pylint: enable=redefined-outer-name
 
   def _set_global_seed(self, seed):
     """Set a global eager mode seed for random ops."""
     self._seed = seed
-    self._rng = random.Random(self._seed)
+    # Without a global seed, operation seeds come from the process-wide
+    # generator; see `_internal_operation_seed`.
+    self._rng = random.Random(seed) if seed is not None else None
     # Also clear the kernel cache, to reset any existing seeds
     if self._context_handle is not None:
       pywrap_tensorflow.TFE_ContextClearCaches(self._context_handle)
@@ -313,25 +588,31 @@ class Context(object):
     Returns:
       A fake operation seed based on global seed.
     """
-    return self._rng.randint(0, _MAXINT32)
+    rng = self._rng
+    if rng is None:
+      rng = random
+    return rng.randint(0, _MAXINT32)
 
   def _initialize_devices(self):
     """Helper to initialize devices."""
-    # Store list of devices
-    self._context_devices = []
-    device_list = pywrap_tensorflow.TFE_ContextListDevices(
-        self._context_handle)
+    # Build the new list of devices before publishing it, so that `devices()`
+    # (which returns the cached list itself) never sees a partial list while
+    # the devices are refreshed, e.g. by `set_server_def`.
+    devices = []
+    num_gpus = 0
+    device_list = _TFE_ContextListDevices(self._context_handle)
     try:
-      self._num_gpus = 0
-      for i in range(pywrap_tensorflow.TF_DeviceListCount(device_list)):
-        dev_name = pywrap_tensorflow.TF_DeviceListName(device_list, i)
-        self._context_devices.append(pydev.canonical_name(dev_name))
-        dev_type = pywrap_tensorflow.TF_DeviceListType(device_list, i)
+      for i in range(_TF_DeviceListCount(device_list)):
+        dev_name = _TF_DeviceListName(device_list, i)
+        devices.append(_canonical_name(dev_name))
+        dev_type = _TF_DeviceListType(device_list, i)
         if dev_type == "GPU":
-          self._num_gpus += 1
+          num_gpus += 1
 
     finally:
-      pywrap_tensorflow.TF_DeleteDeviceList(device_list)
+      _TF_DeleteDeviceList(device_list)
+    self._num_gpus = num_gpus
+    self._context_devices = devices
 
   def _initialize_handle_and_devices(self):
     """Initialize handle and devices."""
@@ -341,7 +622,7 @@ class Context(object):
       assert self._context_devices is None
       opts = pywrap_tensorflow.TFE_NewContextOptions()
       try:
-        config_str = self.config.SerializeToString()
+        config_str = self._cached_config()[0].SerializeToString()
         pywrap_tensorflow.TFE_ContextOptionsSetConfig(opts, config_str)
         if self._device_policy is not None:
           pywrap_tensorflow.TFE_ContextOptionsSetDevicePlacementPolicy(
@@ -366,9 +647,18 @@ class Context(object):
       self._initialize_devices()
 
   def _clear_caches(self):
-    self.scalar_cache().clear()
-    self.ones_rank_cache().flush()
-    self.zeros_cache().flush()
+    # Look at the thread-local dict directly so that caches which were never
+    # used on this thread are not created just to be cleared.
+    data = self._thread_local_data.__dict__
+    scalar_cache = data.get("scalar_cache")
+    if scalar_cache:
+      scalar_cache.clear()
+    ones_rank_cache = data.get("_ones_rank_cache")
+    if ones_rank_cache is not None:
+      ones_rank_cache.flush()
+    zeros_cache = data.get("_zeros_cache")
+    if zeros_cache is not None:
+      zeros_cache.flush()
 
   def set_server_def(self, server_def, keep_alive_secs=600):
     """Allow setting a server_def on the context.
@@ -394,6 +684,9 @@ class Context(object):
     if not self._context_handle:
       self._server_def = server_def
     else:
+      # The serialized form is deliberately not cached on the proto: messages
+      # are mutable and unhashable, and callers commonly edit the same
+      # ServerDef (e.g. the cluster spec) between calls.
       server_def_str = server_def.SerializeToString()
       pywrap_tensorflow.TFE_ContextSetServerDef(self._context_handle,
                                                 keep_alive_secs, server_def_str)
@@ -455,26 +748,11 @@ class Context(object):
         lines.append("   Device %d: %s" % (i, d))
       return "\n".join(lines)
 
-  @tf_contextlib.contextmanager
   def _mode(self, mode):
     """A context manager to allow setting the mode to EAGER/GRAPH."""
-    ctx = self._thread_local_data
-    old_mode = ctx.mode
-    old_is_eager = ctx.is_eager
-    ctx.mode = mode
-    ctx.is_eager = mode == EAGER_MODE
     if mode == EAGER_MODE:
-      # Entering graph mode does not provide us with sufficient information to
-      # record a context switch; graph-based context switches are only logged
-      # when a graph is registered as the default graph.
-      self.context_switches.push(False, eager_mode, None)
-    try:
-      yield
-    finally:
-      ctx.is_eager = old_is_eager
-      ctx.mode = old_mode
-      if mode == EAGER_MODE:
-        self.context_switches.pop()
+      return self._eager_mode_scope
+    return self._graph_mode_scope
 
   def executing_eagerly(self):
     """Returns True if current thread has eager executing enabled."""
@@ -552,58 +830,72 @@ class Context(object):
     """Returns the device spec for the current thread."""
     return self._thread_local_data.device_spec
 
-  @tf_contextlib.contextmanager
   def device(self, name):
     """Context-manager to force placement of operations and Tensors on a device.
 
     Args:
       name: Name of the device or None to get default placement.
 
-    Yields:
-      Nothing.
+    Returns:
+      Context manager that forces device placement.
 
     Raises:
       ValueError: If name is not a string or is an invalid device name.
       RuntimeError: If device scopes are not properly nested.
     """
-    eager_context = self._thread_local_data
-    old_device_name = eager_context.device_name
-    old_device_spec = eager_context.device_spec
-    cache_key = (old_device_name, name)
-    try:
-      new_device_name, new_device_spec = _device_parsing_cache[cache_key]
-    except TypeError:
-      # Error while trying to compute the cache key.
+    return _DeviceScope(self, name)
+
+  def _resolve_device(self, eager_context, name):
+    """Returns the (device_name, device_spec) for a device scope.
+
+    Args:
+      eager_context: The `_ThreadLocalData` of the current thread.
+      name: Name of the device scope being entered, or None.
+
+    Returns:
+      A tuple of the full name and `DeviceSpec` which result from entering
+      device scope `name` inside the current device scope.
+
+    Raises:
+      ValueError: If name is not a string or is an invalid device name.
+    """
+    if name is not None and not isinstance(name, str):
       raise ValueError("Expecting a string device name. Got %s(%s)" %
                        (type(name), name))
-    except KeyError:
-      # Handle a cache miss.
+    old_device_name = eager_context.device_name
+    # Device scopes are mostly entered from the outermost scope, so those are
+    # first looked up in a thread-local cache keyed on the device name alone.
+    if old_device_name:
+      entry = None
+    else:
+      entry = eager_context.device_parsing_cache.get(name)
+    if entry is None:
       if name is not None:
-        if not isinstance(name, str):
-          raise ValueError("Expecting a string device name. Got %s(%s)" %
-                           (type(name), name))
-        device_spec = pydev.DeviceSpec.from_string(name)
-        if old_device_name:
-          new_device_spec = copy.copy(old_device_spec)
+        name = six.moves.intern(name)
+      cache_key = (old_device_name, name)
+      shard = _device_parsing_cache[
+          hash(name) & (_DEVICE_PARSING_CACHE_SHARDS - 1)]
+      entry = shard.get(cache_key)
+      if entry is None:
+        # Handle a cache miss.
+        if name is not None:
+          device_spec = pydev.DeviceSpec.from_string(name)
+          if old_device_name:
+            # pylint: disable=protected-access
+            new_device_spec = eager_context.device_spec._clone()
+            # pylint: enable=protected-access
+          else:
+            self._initialize_handle_and_devices()
+            new_device_spec = pydev.DeviceSpec.from_string(
+                self._context_devices[0])
+          new_device_spec.merge_from(device_spec)
         else:
-          self._initialize_handle_and_devices()
-          new_device_spec = pydev.DeviceSpec.from_string(
-              self._context_devices[0])
-        new_device_spec.merge_from(device_spec)
-      else:
-        new_device_spec = pydev.DeviceSpec.from_string("")
-      new_device_name = new_device_spec.to_string()
-      _device_parsing_cache[cache_key] = (new_device_name, new_device_spec)
-
-    try:
-      eager_context.device_name = new_device_name
-      eager_context.device_spec = new_device_spec
-      yield
-    finally:
-      if eager_context.device_spec is not new_device_spec:
-        raise RuntimeError("Exiting device scope without proper scope nesting")
-      eager_context.device_name = old_device_name
-      eager_context.device_spec = old_device_spec
+          new_device_spec = pydev.DeviceSpec.from_string("")
+        entry = (new_device_spec.to_string(), new_device_spec)
+        shard[cache_key] = entry
+      if not old_device_name:
+        eager_context.device_parsing_cache[name] = entry
+    return entry
 
   def devices(self):
     """List of the names of devices available to execute operations."""
@@ -645,6 +937,39 @@ class Context(object):
   def config(self):
     """Return the ConfigProto with all runtime deltas applied."""
     config = config_pb2.ConfigProto()
+    config.CopyFrom(self._cached_config()[0])
+    return config
+
+  def _cached_config(self):
+    """Returns the cached (config, serialized function call config) pair.
+
+    The returned ConfigProto is shared and must not be modified.
+    """
+    key = (self._gpu_per_process_memory_fraction,
+           self._gpu_per_process_memory_growth,
+           self._optimizer_jit,
+           self._intra_op_parallelism_threads,
+           self._inter_op_parallelism_threads,
+           self._soft_device_placement,
+           self._log_device_placement,
+           tuple(self._optimizer_experimental_options),
+           id(self._config),
+           self.executing_eagerly())
+    entry = self._config_cache.get(key)
+    if entry is None:
+      config = self._build_config()
+      function_config = config_pb2.ConfigProto()
+      function_config.CopyFrom(config)
+      # Default to soft placement for functions unless specified
+      if self._soft_device_placement is None:
+        function_config.allow_soft_placement = True
+      entry = (config, function_config.SerializeToString())
+      self._config_cache[key] = entry
+    return entry
+
+  def _build_config(self):
+    """Builds a new ConfigProto with all runtime deltas applied."""
+    config = config_pb2.ConfigProto()
     if self._config is not None:
       config.CopyFrom(self._config)
 
@@ -670,42 +995,18 @@ class Context(object):
     if self._log_device_placement is not None:
       config.log_device_placement = self._log_device_placement
 
-    def rewriter_toggle(option):
-      toggle = self._optimizer_experimental_options.get(option, None)
-      if toggle is None:
-        return
-
-      setattr(config.graph_options.rewrite_options,
-              option,
-              (rewriter_config_pb2.RewriterConfig.ON
-               if toggle else rewriter_config_pb2.RewriterConfig.OFF))
-
-    def rewriter_bool(option):
-      toggle = self._optimizer_experimental_options.get(option, None)
-      if toggle is None:
-        return
-
-      setattr(config.graph_options.rewrite_options,
-              option,
-              toggle)
-
-    rewriter_toggle("layout_optimizer")
-    rewriter_toggle("constant_folding")
-    rewriter_toggle("shape_optimization")
-    rewriter_toggle("remapping")
-    rewriter_toggle("arithmetic_optimization")
-    rewriter_toggle("dependency_optimization")
-    rewriter_toggle("loop_optimization")
-    rewriter_toggle("function_optimization")
-    rewriter_toggle("debug_stripper")
-    rewriter_bool("disable_model_pruning")
-    rewriter_toggle("scoped_allocator_optimization")
-    rewriter_toggle("pin_to_host_optimization")
-    rewriter_toggle("implementation_selector")
-    rewriter_bool("disable_meta_optimizer")
-    nodes = self._optimizer_experimental_options.get("min_graph_nodes", None)
+    rewrite_options = config.graph_options.rewrite_options
+    values = self._optimizer_experimental_options
+    for option, toggle in zip(_REWRITER_TOGGLES, values):
+      if toggle is not None:
+        setattr(rewrite_options, option,
+                _REWRITER_ON if toggle else _REWRITER_OFF)
+    for option, toggle in zip(_REWRITER_BOOLS, values[_REWRITER_BOOLS_START:]):
+      if toggle is not None:
+        setattr(rewrite_options, option, toggle)
+    nodes = values[_MIN_GRAPH_NODES_INDEX]
     if nodes is not None:
-      config.graph_options.rewrite_options.min_graph_nodes = nodes
+      rewrite_options.min_graph_nodes = nodes
 
     return config
 
@@ -717,29 +1018,37 @@ class Context(object):
 
     Returns: the FunctionCallOptions for current thread.
     """
-    if self._thread_local_data.function_call_options is None:
-      config = self.config
+    data = self._thread_local_data
+    options = data.function_call_options
+    version = self._config_version
+    if options is None:
+      options = FunctionCallOptions(config_proto=self._cached_config()[1])
+      data.function_call_options = options
+      data.function_call_options_version = version
+    elif data.function_call_options_version != version:
+      # The config changed, possibly on another thread. Update the config in
+      # place so that the thread's executor type (e.g. set by an active
+      # `function_executor_type` scope, which restores it on this object) is
+      # kept.
+      options.config_proto_serialized = self._cached_config()[1]
+      data.function_call_options_version = version
 
-      # Default to soft placement for functions unless specified
-      if self._soft_device_placement is None:
-        config.allow_soft_placement = True
-      self._thread_local_data.function_call_options = FunctionCallOptions(
-          config_proto=config)
-
-    return self._thread_local_data.function_call_options
+    return options
 
   @function_call_options.setter
   def function_call_options(self, options):
     """Returns function call options for current thread."""
     self._thread_local_data.function_call_options = options
+    self._thread_local_data.function_call_options_version = (
+        self._config_version)
 
   def async_wait(self):
     """Waits for ops dispatched in ASYNC mode to finish."""
-    pywrap_tensorflow.TFE_ContextAsyncWait(self._handle)
+    _TFE_ContextAsyncWait(self._handle)
 
   def async_clear_error(self):
     """Clears errors raised during ASYNC execution."""
-    pywrap_tensorflow.TFE_ContextAsyncClearError(self._handle)
+    _TFE_ContextAsyncClearError(self._handle)
 
   def num_gpus(self):
     """The number of GPUs available to execute operations."""
@@ -755,7 +1064,7 @@ class Context(object):
     Args:
       fn: A wrapped TF_Function (returned from TF_GraphToFunction_wrapper).
     """
-    pywrap_tensorflow.TFE_ContextAddFunction(self._handle, fn)
+    _TFE_ContextAddFunction(self._handle, fn)
 
   def add_function_def(self, fdef):
     """Add a function definition to the context.
@@ -767,12 +1076,11 @@ class Context(object):
       fdef: A FunctionDef protocol buffer message.
     """
     fdef_string = fdef.SerializeToString()
-    pywrap_tensorflow.TFE_ContextAddFunctionDef(
-        self._handle, fdef_string, len(fdef_string))
+    _TFE_ContextAddFunctionDef(self._handle, fdef_string, len(fdef_string))
 
   def has_function(self, name):
     """Check if a function `name` is registered."""
-    return bool(pywrap_tensorflow.TFE_ContextHasFunction(self._handle, name))
+    return bool(_TFE_ContextHasFunction(self._handle, name))
 
   def add_post_execution_callback(self, callback):
     """Add a post-execution callback to the context.
@@ -811,7 +1119,8 @@ class Context(object):
 
   @property
   def gpu_per_process_memory_fraction(self):
-    return self.config.gpu_options.per_process_gpu_memory_fraction
+    config = self._cached_config()[0]
+    return config.gpu_options.per_process_gpu_memory_fraction
 
   @gpu_per_process_memory_fraction.setter
   def gpu_per_process_memory_fraction(self, fraction):
@@ -820,10 +1129,11 @@ class Context(object):
           "GPU options must be set at program startup")
 
     self._gpu_per_process_memory_fraction = fraction
+    self._config_cache.clear()
 
   @property
   def gpu_per_process_memory_growth(self):
-    return self.config.gpu_options.allow_growth
+    return self._cached_config()[0].gpu_options.allow_growth
 
   @gpu_per_process_memory_growth.setter
   def gpu_per_process_memory_growth(self, enabled):
@@ -832,18 +1142,19 @@ class Context(object):
           "GPU options must be set at program startup")
 
     self._gpu_per_process_memory_growth = enabled
+    self._config_cache.clear()
 
   @property
   def optimizer_jit(self):
-    level = self.config.graph_options.optimizer_options.global_jit_level
-    return (level == config_pb2.OptimizerOptions.ON_1 or
-            level == config_pb2.OptimizerOptions.ON_2)
+    config = self._cached_config()[0]
+    level = config.graph_options.optimizer_options.global_jit_level
+    return level in _JIT_ON_LEVELS
 
   @optimizer_jit.setter
   def optimizer_jit(self, enabled):
     self._optimizer_jit = enabled
-
-    self._thread_local_data.function_call_options = None
+    self._config_cache.clear()
+    self._config_version += 1
 
   def get_optimizer_experimental_options(self):
     """Get experimental options for the optimizer.
@@ -851,32 +1162,16 @@ class Context(object):
     Returns:
       Dictionary of current option values
     """
-    rewrite_options = self.config.graph_options.rewrite_options
+    rewrite_options = self._cached_config()[0].graph_options.rewrite_options
     options = {}
 
-    def rewriter_toggle(option):
+    for option in _REWRITER_TOGGLES:
       attr = getattr(rewrite_options, option)
       if attr != 0:
-        options[option] = (attr == rewriter_config_pb2.RewriterConfig.ON)
-
-    def rewriter_bool(option):
+        options[option] = (attr == _REWRITER_ON)
+    for option in _REWRITER_BOOLS:
       options[option] = getattr(rewrite_options, option)
 
-    rewriter_toggle("layout_optimizer")
-    rewriter_toggle("constant_folding")
-    rewriter_toggle("shape_optimization")
-    rewriter_toggle("remapping")
-    rewriter_toggle("arithmetic_optimization")
-    rewriter_toggle("dependency_optimization")
-    rewriter_toggle("loop_optimization")
-    rewriter_toggle("function_optimization")
-    rewriter_toggle("debug_stripper")
-    rewriter_bool("disable_model_pruning")
-    rewriter_toggle("scoped_allocator_optimization")
-    rewriter_toggle("pin_to_host_optimization")
-    rewriter_toggle("implementation_selector")
-    rewriter_bool("disable_meta_optimizer")
-
     if rewrite_options.min_graph_nodes != 0:
       options["min_graph_nodes"] = rewrite_options.min_graph_nodes
 
@@ -888,13 +1183,17 @@ class Context(object):
     Args:
       options: Dictionary of options to modify
     """
-    self._optimizer_experimental_options.update(options)
-
-    self._thread_local_data.function_call_options = None
+    values = self._optimizer_experimental_options
+    for option, value in options.items():
+      index = _OPTIMIZER_OPTION_INDEX.get(option)
+      if index is not None:
+        values[index] = value
+    self._config_cache.clear()
+    self._config_version += 1
 
   @property
   def intra_op_parallelism_threads(self):
-    return self.config.intra_op_parallelism_threads
+    return self._cached_config()[0].intra_op_parallelism_threads
 
   @intra_op_parallelism_threads.setter
   def intra_op_parallelism_threads(self, num_threads):
@@ -903,10 +1202,11 @@ class Context(object):
           "Intra op parallelism must be set at program startup")
 
     self._intra_op_parallelism_threads = num_threads
+    self._config_cache.clear()
 
   @property
   def inter_op_parallelism_threads(self):
-    return self.config.inter_op_parallelism_threads
+    return self._cached_config()[0].inter_op_parallelism_threads
 
   @inter_op_parallelism_threads.setter
   def inter_op_parallelism_threads(self, num_threads):
@@ -915,20 +1215,21 @@ class Context(object):
           "Inter op parallelism must be set at program startup")
 
     self._inter_op_parallelism_threads = num_threads
+    self._config_cache.clear()
 
   @property
   def soft_device_placement(self):
-    return self.config.allow_soft_placement
+    return self._cached_config()[0].allow_soft_placement
 
   @soft_device_placement.setter
   def soft_device_placement(self, enabled):
     self._soft_device_placement = enabled
-
-    self._thread_local_data.function_call_options = None
+    self._config_cache.clear()
+    self._config_version += 1
 
   @property
   def log_device_placement(self):
-    return self.config.log_device_placement
+    return self._cached_config()[0].log_device_placement
 
   @log_device_placement.setter
   def log_device_placement(self, enabled):
@@ -937,28 +1238,36 @@ class Context(object):
           "Device placement logging must be set at program startup")
 
     self._log_device_placement = enabled
-    self._thread_local_data.function_call_options = None
+    self._config_cache.clear()
+    self._config_version += 1
 
   @property
   def device_policy(self):
     # Only get the policy from the context if it has already been initialized
-    if self._context_handle is not None:
-      return pywrap_tensorflow.TFE_ContextGetDevicePlacementPolicy(self._handle)
+    handle = self._context_handle
+    if handle is not None:
+      return pywrap_tensorflow.TFE_ContextGetDevicePlacementPolicy(handle)
 
     return self._device_policy
 
   @device_policy.setter
   def device_policy(self, policy):
+    # The stored policy is never None, so restoring it (as the `device_policy`
+    # context manager does) returns right away.
+    if policy == self._device_policy:
+      return
     if policy is None:
       policy = DEVICE_PLACEMENT_SILENT
+      if policy == self._device_policy:
+        return
 
-    if self._device_policy != policy:
-      self._device_policy = policy
+    self._device_policy = policy
 
-      # Only set the policy if the context has already been initialized
-      if self._context_handle is not None:
-        pywrap_tensorflow.TFE_ContextSetThreadLocalDevicePlacementPolicy(
-            self._handle, self._device_policy)
+    # Only set the policy if the context has already been initialized
+    handle = self._context_handle
+    if handle is not None:
+      pywrap_tensorflow.TFE_ContextSetThreadLocalDevicePlacementPolicy(
+          handle, policy)
 
   def enable_run_metadata(self):
     """Enables tracing of op execution via RunMetadata.
@@ -970,9 +1279,10 @@ class Context(object):
 
   def disable_run_metadata(self):
     """Disables tracing of op execution via RunMetadata."""
-    if not self._context_handle:
+    handle = self._context_handle
+    if handle is None:
       return
-    pywrap_tensorflow.TFE_ContextDisableRunMetadata(self._context_handle)
+    pywrap_tensorflow.TFE_ContextDisableRunMetadata(handle)
 
   def enable_graph_collection(self):
     """Enables graph collection of executed functions.
@@ -984,9 +1294,10 @@ class Context(object):
 
   def disable_graph_collection(self):
     """Disables graph collections of executed functions."""
-    if not self._context_handle:
+    handle = self._context_handle
+    if handle is None:
       return
-    pywrap_tensorflow.TFE_ContextDisableGraphCollection(self._context_handle)
+    pywrap_tensorflow.TFE_ContextDisableGraphCollection(handle)
 
   def export_run_metadata(self):
     """Returns a RunMetadata proto with accumulated information.
@@ -997,14 +1308,18 @@ class Context(object):
     Returns:
       A RunMetadata protocol buffer. Or None if not enabled.
     """
-    if not self._context_handle:
+    handle = self._context_handle
+    if handle is None:
       return None
     with c_api_util.tf_buffer() as buffer_:
-      pywrap_tensorflow.TFE_ContextExportRunMetadata(
-          self._context_handle, buffer_)
+      pywrap_tensorflow.TFE_ContextExportRunMetadata(handle, buffer_)
       proto_data = pywrap_tensorflow.TF_GetBuffer(buffer_)
+    # The C buffer has been freed at this point, so while parsing only the
+    # serialized bytes and the message being built are alive.
     run_metadata = config_pb2.RunMetadata()
-    run_metadata.ParseFromString(compat.as_bytes(proto_data))
+    # Nothing was collected since the last export, so there is nothing to parse.
+    if proto_data:
+      run_metadata.ParseFromString(proto_data)
     return run_metadata
 
   @property
@@ -1018,6 +1333,11 @@ class Context(object):
   def end_step(self):
     pywrap_tensorflow.TFE_ContextEndStep(self._handle)
 
+# The context is created lazily rather than at import time:
+# `enable_eager_execution` creates it with the user's config, device policy and
+# execution mode, and its thread-local state captures `default_execution_mode`,
+# which may still be changed after import. After the first call `context()` is
+# a single global check, and the lock is only taken while creating it.
 _context = None
 _context_lock = threading.Lock()
 
@@ -1064,10 +1384,13 @@ def executing_eagerly():
   but may also be enabled within the context of a Python function via
   tf.contrib.eager.py_func.
   """
-  if context_safe() is None:
+  # Read the global and the thread-local mode directly; this is called at least
+  # once per op.
+  ctx = _context
+  if ctx is None:
     return default_execution_mode == EAGER_MODE
 
-  return context().executing_eagerly()
+  return ctx._thread_local_data.is_eager  # pylint: disable=protected-access
 
 
 def in_eager_mode():
@@ -1093,7 +1416,7 @@ def shared_name(name=None):
 
   # Ensure a unique name when eager execution is enabled to avoid spurious
   # sharing issues.
-  return "cd2c89b7-88b7-44c8-ad83-06c2a9158347"
+  return _EAGER_SHARED_NAME
 
 
 def graph_mode():
@@ -1107,16 +1430,28 @@ def eager_mode():
 
 
 # TODO(agarwal): get rid of this and use ops.name_scope instead.
-@contextlib.contextmanager
+class _NameScope(object):
+  """Context manager which extends the scope name of the current thread."""
+
+  __slots__ = ["_name", "_ctx", "_old_name"]
+
+  def __init__(self, name):
+    self._name = name
+
+  def __enter__(self):
+    self._ctx = ctx = context()
+    self._old_name = old_name = ctx.scope_name
+    name = self._name
+    # Formatting (rather than concatenation) accepts non-str names.
+    ctx.scope_name = "%s/%s" % (old_name, name) if old_name else name
+
+  def __exit__(self, *exc_info):
+    self._ctx.scope_name = self._old_name
+
+
 def namescope(name):
   """ContextManager for creating hierarchical name scopes."""
-  ctx = context()
-  old_name = ctx.scope_name
-  ctx.scope_name = "%s/%s" % (old_name, name) if old_name else name
-  try:
-    yield
-  finally:
-    ctx.scope_name = old_name
+  return _NameScope(name)
 
 
 def scope_name():
@@ -1177,16 +1512,26 @@ def set_log_device_placement(enabled):
   context().log_device_placement = enabled
 
 
-@tf_contextlib.contextmanager
+class _DevicePolicyScope(object):
+  """Context manager which sets the device placement policy."""
+
+  __slots__ = ["_policy", "_ctx", "_old_policy"]
+
+  def __init__(self, policy):
+    self._policy = policy
+
+  def __enter__(self):
+    self._ctx = ctx = context()
+    self._old_policy = ctx.device_policy
+    ctx.device_policy = self._policy
+
+  def __exit__(self, *exc_info):
+    self._ctx.device_policy = self._old_policy
+
+
 def device_policy(policy):
   """Context manager for setting device placement policy for current thread."""
-  ctx = context()
-  old_policy = ctx.device_policy
-  try:
-    ctx.device_policy = policy
-    yield
-  finally:
-    ctx.device_policy = old_policy
+  return _DevicePolicyScope(policy)
 
 
 def set_execution_mode(mode):
@@ -1194,20 +1539,46 @@ def set_execution_mode(mode):
   context().execution_mode = mode
 
 
-@tf_contextlib.contextmanager
+class _ExecutionModeScope(object):
+  """Context manager which sets the execution mode."""
+
+  __slots__ = ["_mode", "_ctx", "_old_mode"]
+
+  def __init__(self, mode):
+    self._mode = mode
+
+  def __enter__(self):
+    self._ctx = ctx = context()
+    self._old_mode = ctx.execution_mode
+    ctx.execution_mode = self._mode
+
+  def __exit__(self, *exc_info):
+    self._ctx.execution_mode = self._old_mode
+
+
 def execution_mode(mode):
   """Context manager for setting execution mode for current thread."""
-  ctx = context()
-  old_mode = ctx.execution_mode
-  try:
-    ctx.execution_mode = mode
-    yield
-  finally:
-    ctx.execution_mode = old_mode
+  return _ExecutionModeScope(mode)
+
+
+class _FunctionExecutorTypeScope(object):
+  """Context manager which sets the executor of eager defined functions."""
+
+  __slots__ = ["_executor_type", "_options", "_old_executor_type"]
+
+  def __init__(self, executor_type):
+    self._executor_type = executor_type
+
+  def __enter__(self):
+    self._options = options = context().function_call_options
+    self._old_executor_type = options.executor_type
+    options.executor_type = self._executor_type
+
+  def __exit__(self, *exc_info):
+    self._options.executor_type = self._old_executor_type
 
 
 @tf_export("experimental.function_executor_type")
-@tf_contextlib.contextmanager
 def function_executor_type(executor_type):
   """Context manager for setting the executor of eager defined functions.
 
@@ -1217,16 +1588,10 @@ def function_executor_type(executor_type):
     executor_type: a string for the name of the executor to be used to execute
       functions defined by tf.contrib.eager.defun.
 
-  Yields:
+  Returns:
     Context manager for setting the executor of eager defined functions.
   """
-  current_options = context().function_call_options
-  old_options = copy.copy(current_options)
-  try:
-    current_options.executor_type = executor_type
-    yield
-  finally:
-    context().function_call_options = old_options
+  return _FunctionExecutorTypeScope(executor_type)
 
 
 def async_wait():
@@ -1301,12 +1666,16 @@ def add_function(fdef):
 # (for example, enable_eager_execution in python/framework/ops.py),
 # but they do all import this file.  Note that IS_IN_GRAPH_MODE and
 # in_graph_mode are both parameterless functions.
+# The mode is per thread, so it cannot be mirrored into a single process-wide
+# flag (e.g. one shared with the C++ runtime); it has to be looked up in the
+# calling thread's data.
 def _tmp_in_graph_mode():
-  if context_safe() is None:
+  ctx = _context
+  if ctx is None:
     # Context not yet initialized. Assume graph mode following the
     # default implementation in `is_in_graph_mode`.
     return True
-  return not executing_eagerly()
+  return not ctx._thread_local_data.is_eager  # pylint: disable=protected-access
 
 
 is_in_graph_mode.IS_IN_GRAPH_MODE = _tmp_in_graph_mode
@@ -18,9 +18,11 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import gc
 import os
 import pickle
 import threading
+import weakref
 
 import numpy as np
 
@@ -31,6 +33,7 @@ from tensorflow.python.eager import core
 from tensorflow.python.eager import execute as execute_lib
 from tensorflow.python.eager import test
 from tensorflow.python.framework import constant_op
+from tensorflow.python.framework import device as pydev
 from tensorflow.python.framework import dtypes
 from tensorflow.python.framework import errors
 from tensorflow.python.framework import ops
@@ -101,6 +104,102 @@ class TFETest(test_util.TensorFlowTestCase):
     self.assertTrue(has_cpu_device)
     del ctx
 
+  def testDeviceScopeErrors(self):
+    ctx = context.Context()
+    with self.assertRaisesRegexp(ValueError, 'Expecting a string device name'):
+      with ctx.device(1):
+        pass
+    with ctx.device('CPU:0'):
+      with self.assertRaisesRegexp(ValueError,
+                                   'Expecting a string device name'):
+        with ctx.device(pydev.DeviceSpec(device_type='CPU', device_index=0)):
+          pass
+
+    outer = ctx.device('CPU:0')
+    inner = ctx.device(None)
+    outer.__enter__()
+    inner.__enter__()
+    with self.assertRaisesRegexp(RuntimeError, 'proper scope nesting'):
+      outer.__exit__(None, None, None)
+
+  def testNoneAndRepeatedDeviceScopes(self):
+    ctx = context.Context()
+    with ctx.device('CPU:0'):
+      device_name = ctx.device_name
+      with ctx.device(None):
+        self.assertEqual('', ctx.device_name)
+        self.assertEqual('', ctx.device_spec.to_string())
+      with ctx.device(device_name):
+        self.assertEqual(device_name, ctx.device_name)
+      self.assertEqual(device_name, ctx.device_name)
+
+  def testNestedModeScopes(self):
+    ctx = context.Context()
+    graph_mode = ctx._mode(context.GRAPH_MODE)  # pylint: disable=protected-access
+    eager_mode = ctx._mode(context.EAGER_MODE)  # pylint: disable=protected-access
+    with graph_mode:
+      self.assertFalse(ctx.executing_eagerly())
+      with eager_mode:
+        self.assertTrue(ctx.executing_eagerly())
+        with graph_mode:
+          self.assertFalse(ctx.executing_eagerly())
+        self.assertTrue(ctx.executing_eagerly())
+      self.assertFalse(ctx.executing_eagerly())
+    self.assertTrue(ctx.executing_eagerly())
+
+  def testContextIsFreedWithoutGarbageCollection(self):
+    gc.disable()
+    try:
+      ctx = context.Context()
+      with ctx._mode(context.GRAPH_MODE):  # pylint: disable=protected-access
+        pass
+      ref = weakref.ref(ctx)
+      del ctx
+      self.assertIsNone(ref())
+    finally:
+      gc.enable()
+
+  def testNameScope(self):
+    self.assertEqual('', context.scope_name())
+    with context.namescope('a'):
+      with context.namescope('b'):
+        self.assertEqual('a/b', context.scope_name())
+      with context.namescope(1):
+        self.assertEqual('a/1', context.scope_name())
+      self.assertEqual('a', context.scope_name())
+    self.assertEqual('', context.scope_name())
+
+  def testFunctionCallOptionsFollowConfigSetOnOtherThread(self):
+    ctx = context.Context()
+    config = config_pb2.ConfigProto()
+    config.ParseFromString(ctx.function_call_options.config_proto_serialized)
+    self.assertFalse(config.log_device_placement)
+
+    def set_log_device_placement():
+      ctx.log_device_placement = True
+
+    t = threading.Thread(target=set_log_device_placement)
+    t.start()
+    t.join()
+    config.ParseFromString(ctx.function_call_options.config_proto_serialized)
+    self.assertTrue(config.log_device_placement)
+
+  def testExecutorTypeSurvivesConfigSetOnOtherThread(self):
+    ctx = context.Context()
+
+    def set_log_device_placement():
+      ctx.log_device_placement = True
+
+    ctx.function_call_options.executor_type = 'SINGLE_THREADED_EXECUTOR'
+    t = threading.Thread(target=set_log_device_placement)
+    t.start()
+    t.join()
+    options = ctx.function_call_options
+    self.assertEqual('SINGLE_THREADED_EXECUTOR', options.executor_type)
+    config = config_pb2.ConfigProto()
+    config.ParseFromString(options.config_proto_serialized)
+    self.assertTrue(config.log_device_placement)
+
   def testAsyncBasic(self):
     ctx = context.Context(execution_mode=context.ASYNC)
     has_cpu_device = False
@@ -767,6 +866,24 @@ class EagerTensorCacheTest(test_util.TensorFlowTestCase):
     cache.put('2', array_ops.zeros((2)))
     self.assertNotEqual(cache.get('2'), None)
 
+  def testCacheGivesReferencedItemsASecondChance(self):
+    cache = context._EagerTensorCache(max_items=2, max_tensor_size=3)
+    cache.put('1', array_ops.zeros((2)))
+    cache.put('2', array_ops.zeros((2)))
+    self.assertNotEqual(cache.get('1'), None)
+
+    cache.put('3', array_ops.zeros((2)))
+    self.assertNotEqual(cache.get('1'), None)
+    self.assertEqual(cache.get('2'), None)
+    self.assertNotEqual(cache.get('3'), None)
+
+    # Both remaining items were referenced, so the cursor clears both bits and
+    # evicts the oldest one.
+    cache.put('4', array_ops.zeros((2)))
+    self.assertEqual(cache.get('1'), None)
+    self.assertNotEqual(cache.get('3'), None)
+    self.assertNotEqual(cache.get('4'), None)
+
 
 if __name__ == '__main__':
   test.main()
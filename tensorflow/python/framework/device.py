@@ -176,6 +176,12 @@ class DeviceSpec(object):
 
     return self
 
+  def _clone(self):
+    """Returns a copy of this `DeviceSpec` without re-validating its fields."""
+    spec = self.__class__.__new__(self.__class__)
+    spec.__dict__.update(self.__dict__)
+    return spec
+
   def merge_from(self, dev):
     """Merge the properties of "dev" into this `DeviceSpec`.
 
@@ -133,6 +133,16 @@ class DeviceTest(test_util.TensorFlowTestCase):
               var4 = variables.Variable(1.0)
               self.assertEquals("/job:ps/device:CPU:0", var4.device)
 
+  def testClone(self):
+    d = device.DeviceSpec.from_string("/job:foo/replica:0/device:GPU:1")
+    clone = d._clone()  # pylint: disable=protected-access
+    self.assertIsNot(d, clone)
+    self.assertEquals("/job:foo/replica:0/device:GPU:1", clone.to_string())
+    clone.merge_from(device.DeviceSpec.from_string("/task:1/device:CPU:0"))
+    self.assertEquals("/job:foo/replica:0/task:1/device:CPU:0",
+                      clone.to_string())
+    self.assertEquals("/job:foo/replica:0/device:GPU:1", d.to_string())
+
   def testCanonicalName(self):
     self.assertEqual("/job:foo/replica:0",
                      device.canonical_name("/job:foo/replica:0"))
@@ -5704,7 +5704,8 @@ def enable_eager_execution(config=None,
       in which operations are executed. Note that `tf.ConfigProto` is also
       used to configure graph execution (via `tf.Session`) and many options
       within `tf.ConfigProto` are not implemented (or are irrelevant) when
-      eager execution is enabled.
+      eager execution is enabled. Changes made to the proto after eager
+      execution has been enabled are not reliably picked up.
     device_policy: (Optional.) Policy controlling how operations requiring
       inputs on a specific device (e.g., a GPU 0) handle inputs on a different
       device  (e.g. GPU 1 or CPU). When set to None, an appropriate value will be
@@ -64,11 +64,11 @@ def _SumGrad(op, grad):
       rank = len(input_0_shape)
       if np.array_equal(axes, np.arange(rank)):  # Reduce all dims.
         if context.executing_eagerly():
-          ctx = context.context()
-          new_shape = ctx.ones_rank_cache().get(rank)
+          ones_rank_cache = context.context().ones_rank_cache()
+          new_shape = ones_rank_cache.get(rank)
           if new_shape is None:
             new_shape = constant_op.constant([1] * rank, dtype=dtypes.int32)
-            ctx.ones_rank_cache().put(rank, new_shape)
+            ones_rank_cache.put(rank, new_shape)
         else:
           new_shape = [1] * rank
         grad = array_ops.reshape(grad, new_shape)
@@ -190,6 +190,27 @@ limitations under the License.
   }
 }
 
+// Release the Python GIL while these calls block on the eager executor or
+// parse large protos, so that other Python threads (e.g. input pipelines and
+// py_func kernels run by the executor) can make progress. None of them call
+// back into Python; status conversion happens in the argout typemaps, after
+// the GIL has been reacquired.
+%exception TFE_ContextAsyncWait {
+  Py_BEGIN_ALLOW_THREADS;
+  $action
+  Py_END_ALLOW_THREADS;
+}
+%exception TFE_ContextAsyncClearError {
+  Py_BEGIN_ALLOW_THREADS;
+  $action
+  Py_END_ALLOW_THREADS;
+}
+%exception TFE_ContextAddFunctionDef {
+  Py_BEGIN_ALLOW_THREADS;
+  $action
+  Py_END_ALLOW_THREADS;
+}
+
 %rename("%s") TFE_ContextDevicePlacementPolicy;
 %rename("%s") TFE_DEVICE_PLACEMENT_EXPLICIT;
 %rename("%s") TFE_DEVICE_PLACEMENT_WARN;